@@ -0,0 +1,35 @@
+-- Curated trip events written by the Lambda processor.
+-- Partition projection derives year/month/day from the S3 path, so new
+-- partitions are queryable without ALTER TABLE ADD PARTITION or MSCK REPAIR.
+-- Replace ${BUCKET} with the generator's S3_BUCKET_NAME before running; the
+-- other ${...} placeholders are projection variables and must stay as-is.
+-- The year range must match PROJECTION_YEARS in event_processor/lambda_function.py.
+CREATE EXTERNAL TABLE IF NOT EXISTS rideshare_db.curated (
+    event_type      string,
+    trip_id         string,
+    driver_id       string,
+    city            string,
+    `timestamp`     string,
+    fare_amount     double,
+    currency_code   string,
+    currency_symbol string
+)
+PARTITIONED BY (
+    year  int,
+    month int,
+    day   int
+)
+STORED AS PARQUET
+LOCATION 's3://${BUCKET}/curated/'
+TBLPROPERTIES (
+    'projection.enabled'        = 'true',
+    'projection.year.type'      = 'integer',
+    'projection.year.range'     = '2024,2035',
+    'projection.month.type'     = 'integer',
+    'projection.month.range'    = '1,12',
+    'projection.month.digits'   = '2',
+    'projection.day.type'       = 'integer',
+    'projection.day.range'      = '1,31',
+    'projection.day.digits'     = '2',
+    'storage.location.template' = 's3://${BUCKET}/curated/year=${year}/month=${month}/day=${day}/'
+);
@@ -1,7 +1,7 @@
 import boto3
-import json
-import uuid
-import random
+from botocore.config import Config
+import orjson
+from random import choices, uniform
 from datetime import datetime, timedelta
 import time
 import os
@@ -36,60 +36,91 @@ CITY_CONFIG = {
         "currency_symbol": "€"
     }
 }
+# (city, currency_code, currency_symbol) tuples, built once per container
+_CITY_META = tuple(
+    (city, cfg["currency_code"], cfg["currency_symbol"])
+    for city, cfg in CITY_CONFIG.items()
+)
+_DRIVER_NUMS = range(1, 101)
+_TRIP_MINUTES = range(5, 46)
 
-# AWS S3 client
-s3 = boto3.client("s3")
+# AWS S3 client (short timeouts + one retry keep slow PUTs from dominating duration)
+s3 = boto3.client("s3", config=Config(
+    connect_timeout=1,
+    read_timeout=3,
+    tcp_keepalive=True,
+    retries={"mode": "standard", "max_attempts": 2},
+))
 
 # ----------------------
 # Helper Functions
 # ----------------------
-def generate_trip_pair():
-    trip_id = str(uuid.uuid4())
-    driver_id = f"d{random.randint(1,100)}"
+def uuid4_strings(n):
+    """Format n random version-4 UUID strings from a single urandom call."""
+    n = max(n, 0)
+    raw = bytearray(os.urandom(16 * n))
+    ids = []
+    for i in range(0, 16 * n, 16):
+        raw[i + 6] = (raw[i + 6] & 0x0F) | 0x40  # version 4
+        raw[i + 8] = (raw[i + 8] & 0x3F) | 0x80  # RFC 4122 variant
+        h = raw[i:i + 16].hex()
+        ids.append(f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}")
+    return ids
 
-    city = random.choice(list(CITY_CONFIG.keys()))
-    currency_code = CITY_CONFIG[city]["currency_code"]
-    currency_symbol = CITY_CONFIG[city]["currency_symbol"]
+def generate_trips_batch(num_trips, start_time):
+    """Generate num_trips trips starting at start_time.
 
-    start_time = datetime.utcnow()
-    trip_duration_minutes = random.randint(5, 45)
-    end_time = start_time + timedelta(minutes=trip_duration_minutes)
+    Returns parallel lists of trip_start and trip_end events. Random values
+    are drawn in bulk up front rather than per trip.
+    """
+    city_meta = choices(_CITY_META, k=num_trips)
+    driver_nums = choices(_DRIVER_NUMS, k=num_trips)
+    durations = choices(_TRIP_MINUTES, k=num_trips)
+    fares = [round(uniform(5, 50), 2) for _ in range(num_trips)]
+    trip_ids = uuid4_strings(num_trips)
 
-    fare = round(random.uniform(5, 50), 2)
+    start_iso = start_time.isoformat()
+    trip_starts, trip_ends = [], []
+    for trip_id, (city, currency_code, currency_symbol), driver_num, minutes, fare in zip(
+        trip_ids, city_meta, driver_nums, durations, fares
+    ):
+        driver_id = f"d{driver_num}"
+        end_time = start_time + timedelta(minutes=minutes)
 
-    trip_start = {
-        "event_type": "trip_start",
-        "trip_id": trip_id,
-        "driver_id": driver_id,
-        "city": city,
-        "timestamp": start_time.isoformat(),
-        "fare_amount": 0.0,
-        "currency_code": currency_code,
-        "currency_symbol": currency_symbol
-    }
+        trip_starts.append({
+            "event_type": "trip_start",
+            "trip_id": trip_id,
+            "driver_id": driver_id,
+            "city": city,
+            "timestamp": start_iso,
+            "fare_amount": 0.0,
+            "currency_code": currency_code,
+            "currency_symbol": currency_symbol
+        })
 
-    trip_end = {
-        "event_type": "trip_end",
-        "trip_id": trip_id,
-        "driver_id": driver_id,
-        "city": city,
-        "timestamp": end_time.isoformat(),
-        "fare_amount": fare,
-        "currency_code": currency_code,
-        "currency_symbol": currency_symbol
-    }
+        trip_ends.append({
+            "event_type": "trip_end",
+            "trip_id": trip_id,
+            "driver_id": driver_id,
+            "city": city,
+            "timestamp": end_time.isoformat(),
+            "fare_amount": fare,
+            "currency_code": currency_code,
+            "currency_symbol": currency_symbol
+        })
 
-    return trip_start, trip_end
+    return trip_starts, trip_ends
 
-def upload_event_to_s3(event):
-    """Upload a single event JSON to S3 with partitioned path."""
-    dt = datetime.fromisoformat(event["timestamp"])
-    key = (
+def batch_key(dt):
+    """Build the partitioned raw key for one invocation's NDJSON batch."""
+    return (
         f"{RAW_PREFIX}year={dt.year}/month={dt.month:02d}/day={dt.day:02d}/"
-        f"{event['trip_id']}_{event['event_type']}.json"
+        f"batch_{uuid4_strings(1)[0]}.ndjson"
     )
-    s3.put_object(Bucket=S3_BUCKET, Key=key, Body=json.dumps(event))
-    print(f"Uploaded {event['trip_id']} to s3://{S3_BUCKET}/{key}")
+
+def upload_to_s3(key, body):
+    """Upload a prepared object body to S3."""
+    s3.put_object(Bucket=S3_BUCKET, Key=key, Body=body)
 
 # -----------------------------
 # Lambda handler
@@ -98,10 +129,15 @@ def lambda_handler(event, context):
     try:
         num_trips = event.get("num_trips", EVENTS_PER_INVOCATION)
 
-        for _ in range(num_trips):
-            start, end = generate_trip_pair()
-            upload_event_to_s3(start)
-            upload_event_to_s3(end)
+        now = datetime.utcnow()
+        trip_starts, trip_ends = generate_trips_batch(num_trips, now)
+        events = trip_starts + trip_ends
+
+        # One object per invocation instead of one per event
+        if events:
+            key = batch_key(now)
+            upload_to_s3(key, b"\n".join(orjson.dumps(e) for e in events))
+            print(f"{num_trips} trips, {len(events)} events uploaded to s3://{S3_BUCKET}/{key}")
         return {
             "statusCode": 200,
             "body": f"{num_trips} events generated"
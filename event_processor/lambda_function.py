@@ -1,9 +1,9 @@
-import json
 import boto3
-import pandas as pd
+import calendar
+import orjson
+from botocore.config import Config
 import io
-import re
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import unquote_plus
 import os
 import logging
@@ -12,14 +12,24 @@ import logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-s3 = boto3.client('s3')
-athena = boto3.client('athena')
+s3 = boto3.client('s3', config=Config(
+    max_pool_connections=32,
+    connect_timeout=1,
+    read_timeout=3,
+    tcp_keepalive=True,
+    retries={'mode': 'standard', 'max_attempts': 2},
+))
 
-# Constants
-ATHENA_OUTPUT_BUCKET = os.environ.get('ATHENA_OUTPUT_BUCKET', 'rideshare-lake')  # Use env var or default
-ATHENA_FOLDER = "athena-results"
-DATABASE = "rideshare_db"
-TABLE = "curated"
+# Upper bound on S3 objects read concurrently per SQS batch
+MAX_WORKERS = 10
+
+# Kept at module scope so worker threads survive across warm invocations
+executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+
+# pyarrow is imported lazily by _arrow() to keep it out of cold-start init
+_pa = None
+_pq = None
+_schema = None
 
 # Validation constants
 REQUIRED_FIELDS = {
@@ -32,114 +42,269 @@ REQUIRED_FIELDS = {
     "currency_code": str,
     "currency_symbol": str,
 }
+# Keep in sync with projection.year.range in athena/create_tables.sql; rows
+# outside it land in partitions Athena never reads
+PROJECTION_YEARS = (2024, 2035)
 VALID_EVENT_TYPES = {"trip_start", "trip_end"}
-UUID_REGEX = re.compile(r"^[a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12}$")
-CURRENCY_REGEX = re.compile(r"^[A-Z]{3}$")
+HEX_CHARS = frozenset("0123456789abcdef")
 
 
-def validate_event(event: dict):
+def _is_uuid(value: str) -> bool:
+    """Check for a lowercase 8-4-4-4-12 hex UUID without the regex engine."""
+    return (
+        len(value) == 36
+        and value[8] == value[13] == value[18] == value[23] == "-"
+        and value.count("-") == 4
+        and HEX_CHARS.issuperset(value.replace("-", ""))
+    )
+
+
+def _is_currency_code(value: str) -> bool:
+    """Check for a 3-letter uppercase ASCII currency code."""
+    return len(value) == 3 and value.isascii() and value.isalpha() and value.isupper()
+
+
+def _is_iso_timestamp(value: str) -> bool:
+    """Check YYYY-MM-DD[T ]HH:MM:SS[.fff][Z|+HH:MM] by slicing, without building a datetime."""
+    if len(value) < 19 or value[4] != "-" or value[7] != "-" or value[10] not in "T ":
+        return False
+    if value[13] != ":" or value[16] != ":":
+        return False
+    digits = value[0:4] + value[5:7] + value[8:10] + value[11:13] + value[14:16] + value[17:19]
+    if not (digits.isascii() and digits.isdigit()):
+        return False
+    month = int(value[5:7])
+    if not (
+        int(value[0:4]) >= 1
+        and 1 <= month <= 12
+        and 1 <= int(value[8:10]) <= calendar.monthrange(int(value[0:4]), month)[1]
+        and int(value[11:13]) < 24
+        and int(value[14:16]) < 60
+        and int(value[17:19]) < 60
+    ):
+        return False
+
+    # Optional fractional seconds, then an optional UTC offset
+    rest = value[19:]
+    if rest[:1] == ".":
+        fraction = rest[1:]
+        rest = fraction.lstrip("0123456789")
+        if len(rest) == len(fraction):
+            return False
+    if rest in ("", "Z"):
+        return True
+    return (
+        len(rest) == 6
+        and rest[0] in "+-"
+        and rest[3] == ":"
+        and rest[1:3].isascii() and rest[1:3].isdigit()
+        and rest[4:6].isascii() and rest[4:6].isdigit()
+        and int(rest[1:3]) < 24
+        and int(rest[4:6]) < 60
+    )
+
+
+def _raise_field_error(event: dict):
+    """Slow path: report the first missing or mistyped required field."""
     for field, expected_type in REQUIRED_FIELDS.items():
         if field not in event:
             raise ValueError(f"Missing required field: {field}")
-        if not isinstance(event[field], expected_type):
+        expected = expected_type if isinstance(expected_type, tuple) else (expected_type,)
+        if type(event[field]) not in expected:
             raise TypeError(f"Field '{field}' must be {expected_type}, got {type(event[field])}")
 
-    if event["event_type"] not in VALID_EVENT_TYPES:
+
+def validate_event(event: dict):
+    if type(event) is not dict:
+        raise ValueError("event must be a JSON object")
+
+    # Fixed schema, so check fields straight-line and only build messages on failure
+    try:
+        event_type = event["event_type"]
+        trip_id = event["trip_id"]
+        driver_id = event["driver_id"]
+        city = event["city"]
+        timestamp = event["timestamp"]
+        fare_amount = event["fare_amount"]
+        currency_code = event["currency_code"]
+        currency_symbol = event["currency_symbol"]
+    except KeyError:
+        _raise_field_error(event)
+    if not (
+        type(event_type) is str
+        and type(trip_id) is str
+        and type(driver_id) is str
+        and type(city) is str
+        and type(timestamp) is str
+        and (type(fare_amount) is float or type(fare_amount) is int)
+        and type(currency_code) is str
+        and type(currency_symbol) is str
+    ):
+        _raise_field_error(event)
+
+    if event_type not in VALID_EVENT_TYPES:
         raise ValueError("event_type must be 'trip_start' or 'trip_end'")
 
-    if not UUID_REGEX.match(event["trip_id"]):
+    if not _is_uuid(trip_id):
         raise ValueError("trip_id must be a valid UUID")
 
-    try:
-        datetime.fromisoformat(event["timestamp"])
-    except ValueError:
+    if not _is_iso_timestamp(timestamp):
         raise ValueError("timestamp must be ISO 8601 format")
+    if not PROJECTION_YEARS[0] <= int(timestamp[0:4]) <= PROJECTION_YEARS[1]:
+        raise ValueError(f"timestamp year must be within {PROJECTION_YEARS[0]}-{PROJECTION_YEARS[1]}")
 
-    if not CURRENCY_REGEX.match(event["currency_code"]):
+    if not _is_currency_code(currency_code):
         raise ValueError("currency_code must be 3 uppercase letters")
 
-    if event["event_type"] == "trip_start" and event["fare_amount"] != 0:
+    if event_type == "trip_start" and fare_amount != 0:
         raise ValueError("trip_start fare_amount must be 0")
-    if event["event_type"] == "trip_end" and event["fare_amount"] <= 0:
+    if event_type == "trip_end" and fare_amount <= 0:
         raise ValueError("trip_end fare_amount must be > 0")
 
     return True
 
 
-def add_partition(bucket, key):
-    """
-    Add partition to Athena pointing to curated Parquet path
-    """
-    # Use curated folder for Athena partition
-    curated_key_path = key.replace('raw/', 'curated/')
-    s3_path = os.path.dirname(curated_key_path) + "/"
-
-    # Extract year/month/day from path
-    match = re.search(r"year=(\d+)/month=(\d+)/day=(\d+)", key)
-    if not match:
-        raise ValueError("Partition structure not found in key")
-
-    year = int(match.group(1))
-    month = int(match.group(2))
-    day = int(match.group(3))
-
-    query = f"""
-    ALTER TABLE {DATABASE}.{TABLE} ADD IF NOT EXISTS
-    PARTITION (year={year}, month={month:02d}, day={day:02d})
-    LOCATION 's3://{bucket}/{s3_path}';
-    """
-
-    # Run Athena query with explicit output location
-    response = athena.start_query_execution(
-        QueryString=query,
-        QueryExecutionContext={'Database': DATABASE},
-        ResultConfiguration={'OutputLocation': f's3://{bucket}/{ATHENA_FOLDER}/'}  
-    )
+def _arrow():
+    """Import pyarrow on first use and build the curated schema once."""
+    global _pa, _pq, _schema
+    if _pq is None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        _pa = pa
+        _schema = pa.schema([
+            ("event_type", pa.string()),
+            ("trip_id", pa.string()),
+            ("driver_id", pa.string()),
+            ("city", pa.string()),
+            ("timestamp", pa.string()),
+            ("fare_amount", pa.float64()),
+            ("currency_code", pa.string()),
+            ("currency_symbol", pa.string()),
+        ])
+        _pq = pq
+    return _pa, _pq, _schema
 
-    logger.info(f"Athena partition added: s3://{bucket}/{s3_path}")
-    return response
 
+def _message_objects(message):
+    """Return (bucket, key) for every S3 notification wrapped in one SQS message."""
+    notification = orjson.loads(message['body'])
+    # S3 sends an s3:TestEvent without Records when the notification is set up
+    return [
+        (record['s3']['bucket']['name'], unquote_plus(record['s3']['object']['key']))
+        for record in notification.get('Records', [])
+    ]
+
+
+def read_message(message):
+    """Read and validate every raw object referenced by one SQS message."""
+    return [(bucket, key, read_events(bucket, key)) for bucket, key in _message_objects(message)]
 
-def lambda_handler(event, context):
-    try:
-        record = event['Records'][0]
-        bucket = record['s3']['bucket']['name']
-        key = unquote_plus(record['s3']['object']['key'])
 
-        # Read JSON from S3
-        response = s3.get_object(Bucket=bucket, Key=key)
-        content = response['Body'].read().decode('utf-8')
-        data = json.loads(content)
+def read_events(bucket, key):
+    """Read one raw NDJSON batch from S3 and return its validated events."""
+    response = s3.get_object(Bucket=bucket, Key=key)
+    content = response['Body'].read()
 
-        # Validate event
+    rows = []
+    for line in content.splitlines():
+        if not line or line.isspace():
+            continue
+        data = orjson.loads(line)
         validate_event(data)
+        rows.append(data)
 
-        # Flatten JSON
-        df = pd.json_normalize(data)
+    if not rows:
+        raise ValueError(f"No events found in {key}")
+    return rows
 
-        # Convert to Parquet
-        buffer = io.BytesIO()
-        df.to_parquet(buffer, engine='pyarrow', index=False)
-        buffer.seek(0)
 
-        # Curated key
-        curated_key = key.replace('raw/', 'curated/').replace('.json', '.parquet')
+def write_parquet(bucket, curated_key, rows):
+    """Write rows as one Parquet file at curated_key."""
+    # Convert to Parquet (events are flat, so build the Arrow table directly)
+    pa, pq, schema = _arrow()
+    table = pa.Table.from_pylist(rows, schema=schema)
+    buffer = io.BytesIO()
+    # Dictionary pages and compression only pay off when there are rows to share them
+    multi_row = len(rows) > 1
+    pq.write_table(
+        table,
+        buffer,
+        compression='zstd' if multi_row else 'none',
+        compression_level=1 if multi_row else None,
+        use_dictionary=multi_row,
+    )
+    buffer.seek(0)
+
+    # Upload Parquet to S3
+    s3.put_object(
+        Bucket=bucket,
+        Key=curated_key,
+        Body=buffer,
+        ContentType='application/octet-stream'
+    )
+    return curated_key
 
-        # Upload Parquet to S3
-        s3.put_object(
-            Bucket=bucket,
-            Key=curated_key,
-            Body=buffer.getvalue(),
-            ContentType='application/octet-stream'
-        )
 
-        logger.info(f"Processed {key} to {curated_key}")
+def lambda_handler(event, context):
+    messages = event['Records']
 
-        # Add Athena partition
-        add_partition(bucket, key)
+    # Fetch and validate each message's raw objects in parallel; a bad message
+    # only fails itself, the rest of the batch is still written
+    reads = [executor.submit(read_message, message) for message in messages]
+    failed = set()
+    raw_objects = {}
+    for message, read in zip(messages, reads):
+        message_id = message['messageId']
+        try:
+            objects = read.result()
+        except Exception as e:
+            logger.error(f"Error reading message {message_id}: {str(e)}")
+            failed.add(message_id)
+            continue
+        # A raw object delivered twice in one batch is only written once
+        for bucket, key, rows in objects:
+            raw_objects.setdefault((bucket, key), (rows, set()))[1].add(message_id)
 
-        return {'statusCode': 200, 'body': f'Processed {key} to {curated_key}'}
+    # One curated file per (raw object, partition), named after the raw batch,
+    # so a redelivered message rewrites exactly the files it produced before
+    partitions = {}
+    num_events = 0
+    for (bucket, key), (rows, message_ids) in raw_objects.items():
+        num_events += len(rows)
+        batch_name = os.path.splitext(os.path.basename(key))[0]
+        for row in rows:
+            # Partition by the event's own date, not the raw batch's arrival date
+            ts = row['timestamp']
+            curated_key = (
+                f"curated/year={ts[0:4]}/month={ts[5:7]}/day={ts[8:10]}/{batch_name}.parquet"
+            )
+            partitions.setdefault((bucket, curated_key), ([], message_ids))[0].append(row)
+
+    writes = {
+        executor.submit(write_parquet, bucket, curated_key, rows): message_ids
+        for (bucket, curated_key), (rows, message_ids) in partitions.items()
+    }
+    num_files = 0
+    for write, message_ids in writes.items():
+        try:
+            write.result()
+            num_files += 1
+        except Exception as e:
+            # The message is retried; its files in other partitions are rewritten
+            # with the same rows under the same keys, so nothing is duplicated
+            logger.error(f"Error writing messages {sorted(message_ids)}: {str(e)}")
+            failed |= message_ids
+
+    logger.info(
+        f"Processed {num_events} events from {len(messages) - len(failed)}/{len(messages)} "
+        f"messages into {num_files} Parquet files"
+    )
 
-    except Exception as e:
-        logger.error(f"Error processing {key if 'key' in locals() else 'unknown'}: {str(e)}")
-        return {'statusCode': 500, 'body': f'Error: {str(e)}'}
\ No newline at end of file
+    # Partial batch response (requires ReportBatchItemFailures on the event source mapping)
+    return {
+        'batchItemFailures': [
+            {'itemIdentifier': message['messageId']}
+            for message in messages
+            if message['messageId'] in failed
+        ]
+    }
@@ -0,0 +1,45 @@
+import os
+import sys
+import uuid
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("S3_BUCKET_NAME", "rideshare-lake")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "event_generator"))
+
+import event_generator  # noqa: E402
+
+
+class FakeS3:
+    """Records put_object calls instead of sending them."""
+
+    def __init__(self):
+        self.puts = []
+
+    def put_object(self, **kwargs):
+        self.puts.append(kwargs)
+
+
+def test_uuid4_strings_are_valid_version_4_uuids():
+    ids = event_generator.uuid4_strings(500)
+
+    assert len(set(ids)) == 500
+    for value in ids:
+        parsed = uuid.UUID(value)
+        assert str(parsed) == value
+        assert parsed.version == 4
+        assert parsed.variant == uuid.RFC_4122
+
+
+def test_uuid4_strings_handles_non_positive_counts():
+    assert event_generator.uuid4_strings(0) == []
+    assert event_generator.uuid4_strings(-1) == []
+
+
+def test_handler_with_negative_trip_count_generates_nothing(monkeypatch):
+    fake = FakeS3()
+    monkeypatch.setattr(event_generator, "s3", fake)
+
+    result = event_generator.lambda_handler({"num_trips": -1}, None)
+
+    assert result["statusCode"] == 200
+    assert fake.puts == []
@@ -0,0 +1,255 @@
+import io
+import json
+import os
+import re
+import sys
+import uuid
+from datetime import datetime
+
+import orjson
+import pyarrow.parquet as pq
+import pytest
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "event_processor"))
+
+import lambda_function  # noqa: E402
+
+# Patterns the regex-based validator used before it was replaced
+UUID_REGEX = re.compile(r"^[a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12}$")
+CURRENCY_REGEX = re.compile(r"^[A-Z]{3}$")
+
+VALID_EVENT = {
+    "event_type": "trip_end",
+    "trip_id": "0360cfbe-65d5-4860-abf0-01d47cbc99fd",
+    "driver_id": "d1",
+    "city": "Berlin",
+    "timestamp": "2026-02-20T10:00:00.123456",
+    "fare_amount": 12.5,
+    "currency_code": "EUR",
+    "currency_symbol": "€",
+}
+
+
+@pytest.mark.parametrize("value", [
+    str(uuid.uuid4()),
+    "0360cfbe-65d5-4860-abf0-01d47cbc99fd",
+    "0360CFBE-65D5-4860-ABF0-01D47CBC99FD",
+    "0360cfbe65d5-4860-abf0-01d47cbc99fd-",
+    "-" * 36,
+    "g360cfbe-65d5-4860-abf0-01d47cbc99fd",
+    "0360cfbe-65d5-4860-abf0-01d47cbc99f",
+    "",
+])
+def test_is_uuid_matches_regex(value):
+    assert lambda_function._is_uuid(value) == bool(UUID_REGEX.match(value))
+
+
+def test_is_uuid_rejects_trailing_newline():
+    # The old ^...$ pattern accepted this; the new check is deliberately stricter
+    assert not lambda_function._is_uuid("0360cfbe-65d5-4860-abf0-01d47cbc99fd\n")
+
+
+@pytest.mark.parametrize("value", ["USD", "usd", "US", "USDD", "U1D", "ÄBC", ""])
+def test_is_currency_code_matches_regex(value):
+    assert lambda_function._is_currency_code(value) == bool(CURRENCY_REGEX.match(value))
+
+
+@pytest.mark.parametrize("value", [
+    "2026-02-20T10:00:00",
+    "2026-02-20T10:00:00.123456",
+    "2026-02-20 10:00:00",
+    "2026-02-20T10:00:00Z",
+    "2026-02-20T10:00:00+00:00",
+    "2026-02-20T10:00:00.5-05:30",
+    "2024-02-29T00:00:00",
+])
+def test_is_iso_timestamp_accepts(value):
+    datetime.fromisoformat(value)
+    assert lambda_function._is_iso_timestamp(value)
+
+
+@pytest.mark.parametrize("value", [
+    "2026-02-20T10:00:00garbage",
+    "2026-02-30T10:00:00",
+    "2025-02-29T00:00:00",
+    "2026-13-01T00:00:00",
+    "2026-02-20T24:00:00",
+    "2026-02-20T10:00:00.",
+    "2026-02-20T10:00:00+25:00",
+    "2026-02-20",
+    "２０２６-02-20T10:00:00",
+    "0000-01-01T00:00:00",
+])
+def test_is_iso_timestamp_rejects(value):
+    assert not lambda_function._is_iso_timestamp(value)
+
+
+def test_validate_event_accepts_valid_events():
+    assert lambda_function.validate_event(VALID_EVENT)
+    trip_start = dict(VALID_EVENT, event_type="trip_start", fare_amount=0)
+    assert lambda_function.validate_event(trip_start)
+
+
+@pytest.mark.parametrize("event, error, message", [
+    ([1, 2], ValueError, "must be a JSON object"),
+    (None, ValueError, "must be a JSON object"),
+    ({"event_type": "trip_start"}, ValueError, "Missing required field: trip_id"),
+    (dict(VALID_EVENT, trip_id=None), TypeError, "Field 'trip_id'"),
+    (dict(VALID_EVENT, fare_amount=True), TypeError, "Field 'fare_amount'"),
+    (dict(VALID_EVENT, fare_amount="1"), TypeError, "Field 'fare_amount'"),
+    (dict(VALID_EVENT, event_type="trip_pause"), ValueError, "event_type"),
+    (dict(VALID_EVENT, trip_id="not-a-uuid"), ValueError, "trip_id"),
+    (dict(VALID_EVENT, timestamp="2026-02-30T10:00:00"), ValueError, "timestamp"),
+    (dict(VALID_EVENT, timestamp="2023-12-31T23:59:59"), ValueError, "timestamp year"),
+    (dict(VALID_EVENT, timestamp="2036-01-01T00:00:00"), ValueError, "timestamp year"),
+    (dict(VALID_EVENT, currency_code="eur"), ValueError, "currency_code"),
+    (dict(VALID_EVENT, event_type="trip_start"), ValueError, "trip_start fare_amount"),
+    (dict(VALID_EVENT, fare_amount=0.0), ValueError, "trip_end fare_amount"),
+])
+def test_validate_event_rejects(event, error, message):
+    with pytest.raises(error, match=message):
+        lambda_function.validate_event(event)
+
+
+def test_validate_event_reports_missing_field():
+    event = dict(VALID_EVENT)
+    del event["city"]
+    with pytest.raises(ValueError, match="Missing required field: city"):
+        lambda_function.validate_event(event)
+
+
+class FakeS3:
+    """In-memory stand-in for the boto3 S3 client used by the processor."""
+
+    def __init__(self, objects=None, fail_puts=()):
+        self.objects = dict(objects or {})
+        self.fail_puts = set(fail_puts)
+
+    def get_object(self, Bucket, Key):
+        return {"Body": io.BytesIO(self.objects[(Bucket, Key)])}
+
+    def put_object(self, Bucket, Key, Body, ContentType=None):
+        if Key in self.fail_puts:
+            raise RuntimeError(f"put failed for {Key}")
+        self.objects[(Bucket, Key)] = Body.read()
+
+    def curated_rows(self):
+        rows = []
+        for (_, key), body in sorted(self.objects.items()):
+            if key.startswith("curated/"):
+                rows.extend(pq.read_table(io.BytesIO(body)).to_pylist())
+        return rows
+
+
+def trip(start, end, fare=10.0):
+    """Return trip_start/trip_end events for one trip with fixed timestamps."""
+    trip_id = str(uuid.uuid4())
+    base = dict(VALID_EVENT, trip_id=trip_id)
+    return [
+        dict(base, event_type="trip_start", timestamp=start, fare_amount=0.0),
+        dict(base, event_type="trip_end", timestamp=end, fare_amount=fare),
+    ]
+
+
+def ndjson(events):
+    return b"\n".join(orjson.dumps(event) for event in events)
+
+
+def sqs_message(message_id, *keys, bucket="rideshare-lake"):
+    records = [{"s3": {"bucket": {"name": bucket}, "object": {"key": key}}} for key in keys]
+    return {"messageId": message_id, "body": json.dumps({"Records": records})}
+
+
+RAW_1 = "raw/year=2026/month=02/day=20/batch_one.ndjson"
+RAW_2 = "raw/year=2026/month=02/day=20/batch_two.ndjson"
+MIDNIGHT_TRIP = trip("2026-02-20T23:50:00", "2026-02-21T00:35:00", fare=30.0)
+SAME_DAY_TRIP = trip("2026-02-20T09:00:00", "2026-02-20T09:20:00", fare=15.0)
+
+
+@pytest.fixture
+def fake_s3(monkeypatch):
+    fake = FakeS3({
+        ("rideshare-lake", RAW_1): ndjson(MIDNIGHT_TRIP),
+        ("rideshare-lake", RAW_2): ndjson(SAME_DAY_TRIP),
+    })
+    monkeypatch.setattr(lambda_function, "s3", fake)
+    return fake
+
+
+def test_handler_writes_one_file_per_raw_object_and_partition(fake_s3):
+    event = {"Records": [sqs_message("m1", RAW_1), sqs_message("m2", RAW_2)]}
+
+    assert lambda_function.lambda_handler(event, None) == {"batchItemFailures": []}
+
+    curated = {key for _, key in fake_s3.objects if key.startswith("curated/")}
+    assert curated == {
+        "curated/year=2026/month=02/day=20/batch_one.parquet",
+        "curated/year=2026/month=02/day=21/batch_one.parquet",
+        "curated/year=2026/month=02/day=20/batch_two.parquet",
+    }
+    day_21 = fake_s3.objects[("rideshare-lake", "curated/year=2026/month=02/day=21/batch_one.parquet")]
+    assert pq.read_table(io.BytesIO(day_21)).to_pylist() == [MIDNIGHT_TRIP[1]]
+
+
+def test_handler_skips_s3_test_event(fake_s3):
+    event = {"Records": [{"messageId": "t1", "body": json.dumps({"Event": "s3:TestEvent"})}]}
+
+    assert lambda_function.lambda_handler(event, None) == {"batchItemFailures": []}
+    assert not fake_s3.curated_rows()
+
+
+def test_handler_reports_only_the_unreadable_message(fake_s3):
+    bad_key = "raw/year=2026/month=02/day=20/batch_bad.ndjson"
+    fake_s3.objects[("rideshare-lake", bad_key)] = b'{"event_type": "trip_start"}'
+    event = {"Records": [sqs_message("m1", RAW_1), sqs_message("bad", bad_key), sqs_message("m2", RAW_2)]}
+
+    result = lambda_function.lambda_handler(event, None)
+
+    assert result == {"batchItemFailures": [{"itemIdentifier": "bad"}]}
+    assert len(fake_s3.curated_rows()) == 4
+
+
+def test_handler_reports_messages_whose_write_failed(fake_s3):
+    fake_s3.fail_puts = {"curated/year=2026/month=02/day=21/batch_one.parquet"}
+    event = {"Records": [sqs_message("m1", RAW_1), sqs_message("m2", RAW_2)]}
+
+    result = lambda_function.lambda_handler(event, None)
+
+    assert result == {"batchItemFailures": [{"itemIdentifier": "m1"}]}
+
+
+def test_redelivered_subset_keeps_other_messages_rows(fake_s3):
+    fake_s3.fail_puts = {"curated/year=2026/month=02/day=21/batch_one.parquet"}
+    lambda_function.lambda_handler(
+        {"Records": [sqs_message("m1", RAW_1), sqs_message("m2", RAW_2)]}, None
+    )
+
+    # SQS redelivers only the failed message
+    fake_s3.fail_puts = set()
+    result = lambda_function.lambda_handler({"Records": [sqs_message("m1", RAW_1)]}, None)
+
+    assert result == {"batchItemFailures": []}
+    rows = fake_s3.curated_rows()
+    assert sorted(rows, key=lambda row: row["timestamp"]) == sorted(
+        MIDNIGHT_TRIP + SAME_DAY_TRIP, key=lambda row: row["timestamp"]
+    )
+
+
+def test_duplicate_delivery_in_one_batch_writes_rows_once(fake_s3):
+    event = {"Records": [sqs_message("m1", RAW_2), sqs_message("m1-dup", RAW_2)]}
+
+    assert lambda_function.lambda_handler(event, None) == {"batchItemFailures": []}
+    assert len(fake_s3.curated_rows()) == 2
+
+
+def test_midnight_trip_retry_is_idempotent_per_message(fake_s3):
+    event = {"Records": [sqs_message("m1", RAW_1)]}
+    lambda_function.lambda_handler(event, None)
+    first = dict(fake_s3.objects)
+
+    # A trip spanning two partitions is redelivered in full (duplicate delivery)
+    assert lambda_function.lambda_handler(event, None) == {"batchItemFailures": []}
+
+    assert {k for k in fake_s3.objects} == {k for k in first}
+    assert len(fake_s3.curated_rows()) == len(MIDNIGHT_TRIP)